@@ -9,16 +9,18 @@ Version: 1.3.0
 from __future__ import annotations
 
 import asyncio
+import heapq
 import json
+import operator
 import os
 import re
 import sys
 import time
 import copy
-from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
 from urllib.parse import urlencode
 from uuid import uuid4
-from datetime import datetime
 from fastapi import Request
 from pydantic import BaseModel, Field
 
@@ -38,6 +40,13 @@ except ImportError:
         image_generations = None
         GenerateImageForm = None
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 # ─── System Prompts ───────────────────────────────────────────────────────────
 
 PROMPT_DESIGNER_SYS_PROMPT = (
@@ -107,7 +116,24 @@ ONLY return the Final Answer line exactly as shown (no quotes/formatting).
 from dataclasses import dataclass, field
 from contextlib import contextmanager
 
-@dataclass
+class Colors:
+    """ANSI color codes; Debug call sites pass these directly instead of names."""
+
+    RESET = "\x1b[0m"
+    BOLD = "\x1b[1m"
+    DIM = "\x1b[2m"
+    CYAN = "\x1b[96m"
+    GREEN = "\x1b[92m"
+    YELLOW = "\x1b[93m"
+    RED = "\x1b[91m"
+    MAGENTA = "\x1b[95m"
+    BLUE = "\x1b[94m"
+    WHITE = "\x1b[97m"
+    ORANGE = "\x1b[38;5;208m"
+    PURPLE = "\x1b[38;5;129m"
+
+
+@dataclass(slots=True)
 class DebugMetrics:
     """Collects and tracks metrics throughout the debug session."""
     
@@ -131,10 +157,27 @@ class DebugMetrics:
     llm_total_time: float = 0.0
     llm_failures: int = 0
     
-    # Error tracking
-    errors: List[str] = field(default_factory=list)
-    warnings: List[str] = field(default_factory=list)
+    # Error tracking (bounded: only the most recent entries are kept)
+    errors: Deque[str] = field(default_factory=lambda: deque(maxlen=256))
+    warnings: Deque[str] = field(default_factory=lambda: deque(maxlen=256))
     
+    def reset(self) -> None:
+        """Clear all metrics in place so a new session reuses the same containers."""
+        self.start_time = time.perf_counter()
+        self.operation_times.clear()
+        self.total_operations = 0
+        self.tool_decisions = 0
+        self.tool_activations = 0
+        self.handler_calls = 0
+        self.images_processed = 0
+        self.vision_calls = 0
+        self.vision_total_time = 0.0
+        self.llm_calls = 0
+        self.llm_total_time = 0.0
+        self.llm_failures = 0
+        self.errors.clear()
+        self.warnings.clear()
+
     def add_operation_time(self, operation: str, duration: float) -> None:
         """Add timing data for an operation."""
         self.operation_times[operation] = self.operation_times.get(operation, 0) + duration
@@ -142,11 +185,13 @@ class DebugMetrics:
     
     def add_error(self, error: str) -> None:
         """Add an error to tracking."""
-        self.errors.append(f"[{datetime.now().strftime('%H:%M:%S')}] {error}")
+        lt = time.localtime()
+        self.errors.append("[%02d:%02d:%02d] %s" % (lt.tm_hour, lt.tm_min, lt.tm_sec, error))
     
     def add_warning(self, warning: str) -> None:
         """Add a warning to tracking."""
-        self.warnings.append(f"[{datetime.now().strftime('%H:%M:%S')}] {warning}")
+        lt = time.localtime()
+        self.warnings.append("[%02d:%02d:%02d] %s" % (lt.tm_hour, lt.tm_min, lt.tm_sec, warning))
     
     def get_total_time(self) -> float:
         """Get total elapsed time since start."""
@@ -154,55 +199,91 @@ class DebugMetrics:
 
 
 class Debug:
-    """Enhanced structured debug logging system for AutoToolSelector with metrics collection."""
-
-    # ANSI color codes
-    _COLORS = {
-        "RESET": "\x1b[0m",
-        "BOLD": "\x1b[1m",
-        "DIM": "\x1b[2m",
-        "CYAN": "\x1b[96m",
-        "GREEN": "\x1b[92m",
-        "YELLOW": "\x1b[93m",
-        "RED": "\x1b[91m",
-        "MAGENTA": "\x1b[95m",
-        "BLUE": "\x1b[94m",
-        "WHITE": "\x1b[97m",
-        "ORANGE": "\x1b[38;5;208m",
-        "PURPLE": "\x1b[38;5;129m",
-    }
+    """
+    Enhanced structured debug logging system for AutoToolSelector with metrics collection.
 
-    def __init__(self, enabled: bool = False, tool_name: str = "AutoToolSelector"):
+    Logging methods return immediately when disabled and accept printf-style args
+    (`debug.flow("Got %d items", n)`) that are only formatted when output is on.
+    Guard expensive arguments such as repr() or json.dumps() with `if debug.enabled:`.
+    """
+
+    _FLUSH_THRESHOLD = 4096  # chars buffered before writing to stderr
+
+    __slots__ = (
+        "enabled", "tool_name", "flush_each", "metrics", "_session_id",
+        "_buf", "_buf_size", "_ts_sec", "_ts_prefix", "_tool_prefix", "_cat_prefix",
+    )
+
+    def __init__(self, enabled: bool = False, tool_name: str = "AutoToolSelector", flush_each: bool = False):
         self.enabled = enabled
         self.tool_name = tool_name
+        self.flush_each = flush_each  # Write every line immediately (interactive debugging)
+        self._buf: List[str] = []
+        self._buf_size = 0
         self.metrics = DebugMetrics()
         self._session_id = str(int(time.time()))[-6:]  # Last 6 digits of timestamp
+        # One-entry cache of the HH:MM:SS prefix, keyed on the current whole second
+        self._ts_sec = -1
+        self._ts_prefix = ""
+        # tool_name/session_id never change, so the colored line prefixes are built once
+        self._tool_prefix = f"{Colors.MAGENTA}{Colors.BOLD}[{tool_name}:{self._session_id}]{Colors.RESET}"
+        self._cat_prefix: Dict[Tuple[str, str], str] = {}
 
     def _get_timestamp(self) -> str:
-        """Get formatted timestamp."""
-        return datetime.now().strftime("%H:%M:%S.%f")[:-3]  # Include milliseconds
-
-    def _format_msg(self, category: str, message: str, color: str = "CYAN", include_timestamp: bool = True) -> str:
-        """Format a debug message with consistent styling and optional timestamp."""
-        if not self.enabled:
-            return ""
-
-        timestamp = f"{self._COLORS['DIM']}[{self._get_timestamp()}]{self._COLORS['RESET']} " if include_timestamp else ""
-        prefix = f"{self._COLORS['MAGENTA']}{self._COLORS['BOLD']}[{self.tool_name}:{self._session_id}]{self._COLORS['RESET']}"
-        cat_colored = f"{self._COLORS[color]}{self._COLORS['BOLD']}{category:<12}{self._COLORS['RESET']}"
-        msg_colored = f"{self._COLORS[color]}{message}{self._COLORS['RESET']}"
-
-        return f"{timestamp}{prefix} {cat_colored}: {msg_colored}"
-
-    def _log(self, category: str, message: str, color: str = "CYAN", track_metric: bool = True) -> None:
-        """Internal logging method with optional metrics tracking."""
-        if self.enabled:
-            formatted = self._format_msg(category, message, color)
-            if formatted:
-                print(formatted, file=sys.stderr)
-            
-            if track_metric:
-                self.metrics.total_operations += 1
+        """Get formatted timestamp (HH:MM:SS.mmm) without datetime/strftime."""
+        t = time.time()
+        sec = int(t)
+        if sec != self._ts_sec:
+            lt = time.localtime(sec)
+            self._ts_sec = sec
+            self._ts_prefix = "%02d:%02d:%02d" % (lt.tm_hour, lt.tm_min, lt.tm_sec)
+        return "%s.%03d" % (self._ts_prefix, int((t - sec) * 1000))
+
+    def _format_msg(self, category: str, message: str, color: str = Colors.CYAN, include_timestamp: bool = True) -> str:
+        """Format a debug message with consistent styling and optional timestamp. `color` is an ANSI code."""
+        head = self._cat_prefix.get((category, color))
+        if head is None:
+            # "[tool:session] CATEGORY    : " plus the message color, cached per (category, color)
+            head = f"{self._tool_prefix} {color}{Colors.BOLD}{category:<12}{Colors.RESET}: {color}"
+            self._cat_prefix[(category, color)] = head
+        timestamp = f"{Colors.DIM}[{self._get_timestamp()}]{Colors.RESET} " if include_timestamp else ""
+
+        return f"{timestamp}{head}{message}{Colors.RESET}"
+
+    def _log(
+        self,
+        category: str,
+        message: str,
+        color: str = Colors.CYAN,
+        track_metric: bool = True,
+        args: Tuple[Any, ...] = (),
+    ) -> None:
+        """
+        Internal logging method with optional metrics tracking. `args` are %-formatted in lazily.
+        Callers check `self.enabled` first so disabled logging never reaches here.
+        """
+        if args:
+            message = message % args
+        self._write(self._format_msg(category, message, color))
+
+        if track_metric:
+            self.metrics.total_operations += 1
+
+    def _write(self, line: str) -> None:
+        """Buffer a line for stderr, flushing once the buffer passes the threshold."""
+        self._buf.append(line)
+        self._buf.append("\n")
+        self._buf_size += len(line) + 1
+        if self.flush_each or self._buf_size > self._FLUSH_THRESHOLD:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write any buffered log lines to stderr in one call."""
+        if self._buf:
+            sys.stderr.write("".join(self._buf))
+            sys.stderr.flush()
+            self._buf.clear()
+            self._buf_size = 0
 
     @contextmanager
     def timer(self, operation_name: str):
@@ -214,48 +295,69 @@ class Debug:
             duration = time.perf_counter() - start
             self.metrics.add_operation_time(operation_name, duration)
             if self.enabled:
-                self._log("TIMING", f"{operation_name} completed in {duration:.3f}s", "ORANGE", track_metric=False)
+                self._log("TIMING", "%s completed in %.3fs", Colors.ORANGE, track_metric=False, args=(operation_name, duration))
 
     def start_session(self, description: str = "") -> None:
         """Start a new debug session."""
-        self.metrics = DebugMetrics()  # Reset metrics
+        self.metrics.reset()
+        self.flush()  # Don't let a previous session's tail mix into this one
+        if not self.enabled:
+            return
         session_msg = f"Debug session started" + (f": {description}" if description else "")
-        self._log("SESSION", session_msg, "PURPLE", track_metric=False)
-        self._log("SESSION", f"Session ID: {self._session_id}", "DIM", track_metric=False)
+        self._log("SESSION", session_msg, Colors.PURPLE, track_metric=False)
+        self._log("SESSION", f"Session ID: {self._session_id}", Colors.DIM, track_metric=False)
 
-    def router(self, message: str) -> None:
+    def router(self, message: str, *args: Any) -> None:
         """Log router decision making."""
-        self._log("ROUTER", message, "BLUE")
         self.metrics.tool_decisions += 1
+        if not self.enabled:
+            return
+        self._log("ROUTER", message, Colors.BLUE, args=args)
 
-    def vision(self, message: str) -> None:
+    def vision(self, message: str, *args: Any) -> None:
         """Log vision processing."""
-        self._log("VISION", message, "GREEN")
         self.metrics.vision_calls += 1
+        if not self.enabled:
+            return
+        self._log("VISION", message, Colors.GREEN, args=args)
 
-    def tool(self, message: str) -> None:
+    def tool(self, message: str, *args: Any) -> None:
         """Log tool activation."""
-        self._log("TOOL", message, "YELLOW")
         self.metrics.tool_activations += 1
+        if not self.enabled:
+            return
+        self._log("TOOL", message, Colors.YELLOW, args=args)
 
-    def handler(self, message: str) -> None:
+    def handler(self, message: str, *args: Any) -> None:
         """Log special handler activity."""
-        self._log("HANDLER", message, "MAGENTA")
         self.metrics.handler_calls += 1
+        if not self.enabled:
+            return
+        self._log("HANDLER", message, Colors.MAGENTA, args=args)
 
-    def error(self, message: str) -> None:
+    def error(self, message: str, *args: Any) -> None:
         """Log errors and warnings."""
-        self._log("ERROR", message, "RED")
+        # Always formatted: issues are kept in metrics even when output is disabled
+        if args:
+            message = message % args
         self.metrics.add_error(message)
+        if self.enabled:
+            self._log("ERROR", message, Colors.RED)
 
-    def warning(self, message: str) -> None:
+    def warning(self, message: str, *args: Any) -> None:
         """Log warnings."""
-        self._log("WARNING", message, "YELLOW")
+        # Always formatted: issues are kept in metrics even when output is disabled
+        if args:
+            message = message % args
         self.metrics.add_warning(message)
+        if self.enabled:
+            self._log("WARNING", message, Colors.YELLOW)
 
-    def flow(self, message: str) -> None:
+    def flow(self, message: str, *args: Any) -> None:
         """Log general workflow steps."""
-        self._log("FLOW", message, "CYAN")
+        if not self.enabled:
+            return
+        self._log("FLOW", message, Colors.CYAN, args=args)
 
     def data(self, label: str, data: Any, truncate: Optional[int] = None) -> None:
         """Log data with optional truncation. Set truncate=None to disable."""
@@ -264,7 +366,7 @@ class Debug:
         data_str = str(data)
         if truncate is not None and isinstance(data, str) and len(data_str) > truncate:
             data_str = f"{data_str[:truncate]}..."
-        self._log("DATA", f"{label} → {data_str}", "DIM")
+        self._log("DATA", "%s → %s", Colors.DIM, args=(label, data_str))
 
     def llm_call(self, model: str, success: bool = True, duration: float = 0.0) -> None:
         """Track LLM call metrics."""
@@ -272,17 +374,22 @@ class Debug:
         self.metrics.llm_total_time += duration
         if not success:
             self.metrics.llm_failures += 1
-        
+        if not self.enabled:
+            return
+
         status = "✓" if success else "✗"
-        self._log("LLM", f"{status} {model} ({duration:.3f}s)", "GREEN" if success else "RED")
+        self._log("LLM", "%s %s (%.3fs)", Colors.GREEN if success else Colors.RED, args=(status, model, duration))
 
     def vision_metrics(self, images: int = 0, duration: float = 0.0) -> None:
         """Update vision-related metrics."""
         self.metrics.images_processed += images
         self.metrics.vision_total_time += duration
 
-    def metrics_summary(self) -> None:
-        """Display comprehensive metrics summary at the end of execution."""
+    def metrics_summary(self, full: bool = False) -> None:
+        """
+        Display comprehensive metrics summary at the end of execution.
+        Only the 20 slowest operations are listed unless `full` is set.
+        """
         if not self.enabled:
             return
         
@@ -302,9 +409,17 @@ class Debug:
         
         if self.metrics.operation_times:
             report_lines.append("   Operation Breakdown:")
-            for op, duration in sorted(self.metrics.operation_times.items(), key=lambda x: x[1], reverse=True):
+            op_times = self.metrics.operation_times
+            by_duration = operator.itemgetter(1)
+            if full:
+                top_ops = sorted(op_times.items(), key=by_duration, reverse=True)
+            else:
+                top_ops = heapq.nlargest(20, op_times.items(), key=by_duration)
+            for op, duration in top_ops:
                 percentage = (duration / total_time) * 100 if total_time > 0 else 0
                 report_lines.append(f"     • {op}: {duration:.3f}s ({percentage:.1f}%)")
+            if len(op_times) > len(top_ops):
+                report_lines.append(f"     • ... {len(op_times) - len(top_ops)} more")
         
         report_lines.extend([
             "",
@@ -344,12 +459,12 @@ class Debug:
             
             if self.metrics.errors:
                 report_lines.append("   Recent Errors:")
-                for error in self.metrics.errors[-3:]:  # Show last 3 errors
+                for error in list(self.metrics.errors)[-3:]:  # Show last 3 errors
                     report_lines.append(f"     • {error}")
             
             if self.metrics.warnings:
                 report_lines.append("   Recent Warnings:")
-                for warning in self.metrics.warnings[-3:]:  # Show last 3 warnings
+                for warning in list(self.metrics.warnings)[-3:]:  # Show last 3 warnings
                     report_lines.append(f"     • {warning}")
         
         report_lines.extend([
@@ -360,16 +475,15 @@ class Debug:
         
         # Print the metrics report
         metrics_report = "\n".join(report_lines)
-        formatted = self._format_msg("METRICS", metrics_report, "PURPLE", include_timestamp=False)
-        if formatted:
-            print(formatted, file=sys.stderr)
+        self._write(self._format_msg("METRICS", metrics_report, Colors.PURPLE, include_timestamp=False))
+        self.flush()
 
 
 # Legacy compatibility - will be replaced
 def _debug(msg: str) -> None:
     """Legacy debug function - use Debug class instead."""
     print(
-        f"{Debug._COLORS['MAGENTA']}{Debug._COLORS['BOLD']}[AutoToolSelector]{Debug._COLORS['RESET']}{Debug._COLORS['CYAN']} {msg}{Debug._COLORS['RESET']}",
+        f"{Colors.MAGENTA}{Colors.BOLD}[AutoToolSelector]{Colors.RESET}{Colors.CYAN} {msg}{Colors.RESET}",
         file=sys.stderr,
     )
 
@@ -424,9 +538,56 @@ def get_last_user_message(messages: List[Dict[str, Any]]) -> str:
 # ─── Regex & Keyword Helpers ──────────────────────────────────────────────────
 _JSON_RE = re.compile(r"\{.*?\}", re.S)
 _URL_RE = re.compile(r"https?://\S+")
+_TRAILING_COMMA_RE = re.compile(r",\s*([\]}])")
 
 
 # ─── Image Gen Helpers ────────────────────────────────────────────────────────
+_IMAGE_CACHE_TTL = 300  # seconds
+_image_url_cache: "OrderedDict[tuple, Tuple[float, str]]" = OrderedDict()
+# Generations currently running, keyed like the cache, so concurrent identical
+# prompts from the same user share one backend call instead of each issuing their own
+_image_inflight: Dict[tuple, "asyncio.Future[Optional[str]]"] = {}
+
+
+def _image_cache_key(request: Any, user: Any, prompt: str) -> tuple:
+    """
+    Cache key for a generated image: (user id, image engine, image model, prompt).
+    Generated images are files owned by the requesting user, so entries are never
+    shared across users; engine/model are included so changing them in Admin
+    Settings > Images doesn't serve images from the previous backend.
+    """
+    config = getattr(getattr(getattr(request, "app", None), "state", None), "config", None)
+    return (
+        getattr(user, "id", None),
+        getattr(config, "IMAGE_GENERATION_ENGINE", None),
+        getattr(config, "IMAGE_GENERATION_MODEL", None),
+        " ".join(prompt.split()).lower(),
+    )
+
+
+def _image_cache_get(key: tuple) -> Optional[str]:
+    """Return a cached image URL if it is still fresh, refreshing its LRU position."""
+    entry = _image_url_cache.get(key)
+    if entry is None:
+        return None
+    ts, url = entry
+    if time.monotonic() - ts > _IMAGE_CACHE_TTL:
+        del _image_url_cache[key]
+        return None
+    _image_url_cache.move_to_end(key)
+    return url
+
+
+def _image_cache_put(key: tuple, url: str, maxsize: int) -> None:
+    """Store an image URL, evicting the least recently used entries beyond maxsize."""
+    if maxsize <= 0:
+        return
+    _image_url_cache[key] = (time.monotonic(), url)
+    _image_url_cache.move_to_end(key)
+    while len(_image_url_cache) > maxsize:
+        _image_url_cache.popitem(last=False)
+
+
 def _parse_json_fuzzy(text: str, debug: Debug = None) -> Dict[str, str]:
     raw = text.strip()
     if raw.startswith("```") and raw.endswith("```"):
@@ -435,7 +596,11 @@ def _parse_json_fuzzy(text: str, debug: Debug = None) -> Dict[str, str]:
     if m:
         raw = m.group(0)
     try:
-        return json.loads(raw)
+        try:
+            return _json_loads(raw)
+        except ValueError:
+            # Only rewrite on failure: the substitution would also edit valid string contents
+            return _json_loads(_TRAILING_COMMA_RE.sub(r"\1", raw))
     except Exception as e:
         if debug:
             debug.error(f"JSON parse error → {e}. Raw: {raw[:80]}…")
@@ -476,7 +641,7 @@ async def _generate_prompt_and_desc(
         prompt = obj.get("prompt", user_query)
         description = obj.get("description", "Image generated from conversation.")
         if debug:
-            debug.handler(f"Router prompt → {prompt[:60]}… | desc: {description}")
+            debug.handler("Router prompt → %.60s… | desc: %s", prompt, description)
         return prompt, description
     except Exception as exc:
         duration = time.perf_counter() - start_time
@@ -494,12 +659,30 @@ async def image_generation_handler(
     Image generation handler that uses OpenWebUI's built-in image generation pipeline.
     Configure image generation settings in Admin Settings > Images.
     """
-    prompt: str = ctx.get("prompt") or get_last_user_message(body["messages"])
+    # Normalize once; everything below (guard, cache key, status, metadata) uses the stripped prompt
+    prompt: str = (ctx.get("prompt") or get_last_user_message(body["messages"]) or "").strip()
     description: str = ctx.get("description", "Image generated.")
     emitter = ctx.get("__event_emitter__")
+    cache_size: int = ctx.get("image_cache_size", 512)
+    # Status text is built once and shared by the join and generate paths
+    generating_msg = f'Generating image: "{prompt[:60]}..."'
 
     if debug:
-        debug.handler(f"Image generation request → {prompt[:80]}…")
+        debug.handler("Image generation request → %.80s…", prompt)
+
+    if not prompt:
+        if debug:
+            debug.warning("Empty image prompt, skipping generation")
+        fail = "❌ Image generation failed: empty prompt."
+        if emitter:
+            await emitter(
+                {
+                    "type": "status",
+                    "data": {"description": fail, "done": True},
+                }
+            )
+        body["messages"].append({"role": "system", "content": fail})
+        return body
 
     # Check if built-in image generation is available
     if image_generations is None or GenerateImageForm is None:
@@ -515,13 +698,92 @@ async def image_generation_handler(
             )
         return body
 
+    cache_key = _image_cache_key(request, user, prompt)
+    image_url = _image_cache_get(cache_key) if cache_size > 0 else None
+    if image_url is not None:
+        if debug:
+            debug.handler("♻️ Image cache hit → %s", image_url)
+        if emitter:
+            await emitter(
+                {
+                    "type": "status",
+                    "data": {"description": "Reusing recently generated image...", "done": False},
+                }
+            )
+    else:
+        inflight = _image_inflight.get(cache_key) if cache_size > 0 else None
+        if inflight is not None:
+            if debug:
+                debug.handler("Joining in-flight generation for identical prompt")
+            if emitter:
+                await emitter(
+                    {
+                        "type": "status",
+                        "data": {"description": generating_msg, "done": False},
+                    }
+                )
+            image_url = await asyncio.shield(inflight)
+
+        # Nothing to join, or the shared generation failed: generate for this request
+        if image_url is None:
+            fut = asyncio.get_running_loop().create_future()
+            if cache_size > 0:
+                _image_inflight[cache_key] = fut
+            try:
+                image_url = await _generate_image_url(
+                    request, prompt, user, emitter, body, debug, generating_msg
+                )
+            finally:
+                if _image_inflight.get(cache_key) is fut:
+                    del _image_inflight[cache_key]
+                fut.set_result(image_url)
+            if image_url is None:
+                return body
+            # Only cache real URLs (absolute or OpenWebUI-relative), never fallback payloads
+            if image_url.startswith(("http://", "https://", "/")):
+                _image_cache_put(cache_key, image_url, cache_size)
+
+    # Clear status
+    if emitter:
+        await emitter(
+            {
+                "type": "status",
+                "data": {"description": "", "done": True},
+            }
+        )
+
+    # Inject image metadata into conversation for the model to embed
+    meta = (
+        "[IMAGE_GENERATED]\n"
+        f"url: {image_url}\n"
+        f"prompt: {prompt}\n"
+        f"description: {description}\n"
+        '[IMAGE_INSTRUCTION] Embed the generated image using ![description](url) and add a one-sentence caption.'
+    )
+    body["messages"].append({"role": "system", "content": meta})
+    return body
+
+
+async def _generate_image_url(
+    request: Any,
+    prompt: str,
+    user: Any,
+    emitter: Any,
+    body: dict,
+    debug: Debug = None,
+    status_msg: str = "Generating image...",
+) -> Optional[str]:
+    """
+    Run OpenWebUI's image pipeline and extract the first image URL.
+    On failure, reports the error to the conversation and returns None.
+    """
     # Show status while generating
     if emitter:
         await emitter(
             {
                 "type": "status",
                 "data": {
-                    "description": f'Generating image: "{prompt[:60]}..."',
+                    "description": status_msg,
                     "done": False,
                 },
             }
@@ -580,16 +842,16 @@ async def image_generation_handler(
             url_matches = _URL_RE.findall(response_str)
             image_urls = url_matches if url_matches else [response_str]
             if debug:
-                debug.warning(f"Using fallback URL extraction, found: {len(image_urls)} URLs")
+                debug.warning("Using fallback URL extraction, found: %d URLs", len(image_urls))
 
         image_url = image_urls[0] if image_urls else ""
 
         if debug:
-            debug.handler(f"✅ Image URL → {image_url}")
+            debug.handler("✅ Image URL → %s", image_url)
 
     except Exception as exc:
         if debug:
-            debug.error(f"Image generation error → {exc}")
+            debug.error("Image generation error → %s", exc)
         fail = f"❌ Image generation failed: {exc}"
         if emitter:
             await emitter(
@@ -600,27 +862,9 @@ async def image_generation_handler(
             )
         # Inject error into conversation so model can respond appropriately
         body["messages"].append({"role": "system", "content": fail})
-        return body
+        return None
 
-    # Clear status
-    if emitter:
-        await emitter(
-            {
-                "type": "status",
-                "data": {"description": "", "done": True},
-            }
-        )
-
-    # Inject image metadata into conversation for the model to embed
-    meta = (
-        "[IMAGE_GENERATED]\n"
-        f"url: {image_url}\n"
-        f"prompt: {prompt}\n"
-        f"description: {description}\n"
-        '[IMAGE_INSTRUCTION] Embed the generated image using ![description](url) and add a one-sentence caption.'
-    )
-    body["messages"].append({"role": "system", "content": meta})
-    return body
+    return image_url
 
 
 async def default_web_search_handler(
@@ -676,7 +920,7 @@ async def code_interpreter_handler(
     body.setdefault("features", {})["code_interpreter"] = True
     if debug:
         interpreter_type = "Jupyter notebook" if use_jupyter else "basic code execution"
-        debug.handler(f"🔧 Code Interpreter enabled for this turn ({interpreter_type})")
+        debug.handler("🔧 Code Interpreter enabled for this turn (%s)", interpreter_type)
     # Clear status immediately; the main model will proceed to respond
     if emitter:
         try:
@@ -756,6 +1000,10 @@ class Filter:
             default=True,
             description="Use Jupyter notebook environment for code interpreter. If False, uses basic code execution.",
         )
+        image_cache_size: int = Field(
+            default=512,
+            description="Max recently generated image URLs reused for repeated prompts (5 minute TTL). 0 disables the cache.",
+        )
 
     class UserValves(BaseModel):
         auto_tools: bool = Field(default=True)
@@ -779,6 +1027,20 @@ class Filter:
         __request__: Request,
         __user__: dict | None = None,
         __model__: dict | None = None,
+    ) -> dict:
+        try:
+            return await self._inlet(body, __event_emitter__, __request__, __user__, __model__)
+        finally:
+            # Debug output is buffered; make sure this request's lines reach the logs
+            self.debug.flush()
+
+    async def _inlet(
+        self,
+        body: dict,
+        __event_emitter__: Callable[[dict], Awaitable[None]],
+        __request__: Request,
+        __user__: dict | None = None,
+        __model__: dict | None = None,
     ) -> dict:
         # Update debug state based on current valve setting
         self.debug.enabled = self.valves.debug_enabled
@@ -791,7 +1053,7 @@ class Filter:
             self.debug.flow("No messages found, skipping processing")
             return body
 
-        self.debug.flow(f"Processing {len(messages)} messages")
+        self.debug.flow("Processing %d messages", len(messages))
 
         last_user_content_obj = get_last_user_message_content(messages)
         user_message_text, image_urls = _get_message_parts(last_user_content_obj)
@@ -862,7 +1124,7 @@ class Filter:
 
             async def sem_wrapper(i: int, u: str) -> str:
                 async with sem:
-                    self.debug.vision(f"Analyzing image {i + 1}/{len(image_urls)}...")
+                    self.debug.vision("Analyzing image %d/%d...", i + 1, len(image_urls))
                     return await describe_image(i, u)
 
             image_descriptions = await asyncio.gather(
@@ -870,7 +1132,7 @@ class Filter:
             )
 
             elapsed_vision = time.perf_counter() - start_vision
-            self.debug.flow(f"Vision analysis completed in {elapsed_vision:.2f}s for {len(image_urls)} image(s)")
+            self.debug.flow("Vision analysis completed in %.2fs for %d image(s)", elapsed_vision, len(image_urls))
 
             # Clear the vision analysis status now that it's complete
             try:
@@ -919,7 +1181,7 @@ class Filter:
                                 "text": final_text,
                             }
                         ]
-                        self.debug.vision(f"Stripped images from message {msg_idx}")
+                        self.debug.vision("Stripped images from message %d", msg_idx)
 
             # Only process current message images if they exist
             if last_user_message_idx != -1 and image_urls:
@@ -965,7 +1227,7 @@ class Filter:
             "stream": False,
         }
 
-        self.debug.router(f"Sending routing query to model: {router_payload['model']}")
+        self.debug.router("Sending routing query to model: %s", router_payload["model"])
         self.debug.data("Routing query", routing_query, truncate=120)
 
         try:
@@ -1002,7 +1264,7 @@ class Filter:
                     decision = last_line
                     decision_tool = last_line
 
-            self.debug.router(f"Extracted decision → {decision}")
+            self.debug.router("Extracted decision → %s", decision)
 
         except Exception as exc:
             elapsed_router = time.perf_counter() - start_router if 'start_router' in locals() else 0
@@ -1040,30 +1302,34 @@ class Filter:
                 tool_body["messages"] = tool_messages
 
         if decision in self.special_handlers:
-            self.debug.handler(f"Activating special handler for '{decision}'")
+            self.debug.handler("Activating special handler for '%s'", decision)
             handler = self.special_handlers[decision]
             ctx = {"__event_emitter__": __event_emitter__}
 
             if decision == "image_generation":
-                await __event_emitter__(
-                    {
-                        "type": "status",
-                        "data": {
-                            "description": "Developing creative concept...",
-                            "done": False,
-                        },
-                    }
-                )
-                prompt, desc = await _generate_prompt_and_desc(
-                    __request__,
-                    user_obj,
-                    router_payload["model"],
-                    convo_snippet,
-                    user_message_text,
-                    self.debug,
+                # Emit the status while the prompt designer call is already in flight
+                _, (prompt, desc) = await asyncio.gather(
+                    __event_emitter__(
+                        {
+                            "type": "status",
+                            "data": {
+                                "description": "Developing creative concept...",
+                                "done": False,
+                            },
+                        }
+                    ),
+                    _generate_prompt_and_desc(
+                        __request__,
+                        user_obj,
+                        router_payload["model"],
+                        convo_snippet,
+                        user_message_text,
+                        self.debug,
+                    ),
                 )
                 ctx["prompt"] = prompt
                 ctx["description"] = desc
+                ctx["image_cache_size"] = self.valves.image_cache_size
             elif decision == "code_interpreter":
                 # Pass the valve setting to determine which code interpreter to use
                 return await handler(
@@ -1088,11 +1354,11 @@ class Filter:
                 self.debug.handler("Calling default web_search handler")
                 return await handler(__request__, tool_body, ctx, user_obj)
             else:
-                self.debug.handler(f"Calling {decision} handler with 5 parameters (including debug)")
+                self.debug.handler("Calling %s handler with 5 parameters (including debug)", decision)
                 return await handler(__request__, tool_body, ctx, user_obj, self.debug)
 
         elif decision and decision != "none" and decision in tool_ids:
-            self.debug.tool(f"Activating standard tool with ID → {decision}")
+            self.debug.tool("Activating standard tool with ID → %s", decision)
             # For standard tools, we modify the main body that gets passed on.
             # Special case for web_search: use handler if valve is set to default, otherwise use tool ID
             if decision == "web_search" and not self.valves.use_exa_agentic_search:
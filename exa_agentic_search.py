@@ -14,8 +14,14 @@ import re
 import sys
 import json
 import asyncio
+import functools
+import io
+import random
 import time
-from typing import Any, Awaitable, Callable, Dict, List, Optional
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 from urllib.parse import urlparse
@@ -34,6 +40,13 @@ except ImportError:
     Exa = None
     EXA_AVAILABLE = False
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 
 # ─── System Prompts ───────────────────────────────────────────────────────────
 
@@ -108,7 +121,7 @@ KEY_POINTS:
 
 
 # ─── Enhanced Debug System ──────────────────────────────────────────────────
-from contextlib import contextmanager
+from contextlib import nullcontext
 
 @dataclass
 class IterationRecord:
@@ -138,16 +151,24 @@ class DebugMetrics:
     llm_calls: int = 0
     llm_total_time: float = 0.0
     
-    # Issues
-    errors: List[str] = field(default_factory=list)
-    warnings: List[str] = field(default_factory=list)
+    # Issues (bounded: tracked even when output is disabled)
+    errors: Deque[str] = field(default_factory=lambda: deque(maxlen=256))
+    warnings: Deque[str] = field(default_factory=lambda: deque(maxlen=256))
     
     def get_total_time(self) -> float:
         return time.perf_counter() - self.start_time
 
 
+_NULL_TIMER = nullcontext()
+
+
 class Debug:
-    """Clean, focused debug logging for AgenticSearchTool."""
+    """
+    Clean, focused debug logging for AgenticSearchTool.
+
+    The silent trace methods (flow, search, synthesis, ...) take printf-style args
+    (`debug.flow("Got %d items", n)`) so callers never pay to format a discarded message.
+    """
 
     C = {"R": "\x1b[0m", "B": "\x1b[1m", "D": "\x1b[2m", "CY": "\x1b[96m", "GR": "\x1b[92m", 
          "YE": "\x1b[93m", "RD": "\x1b[91m", "MG": "\x1b[95m", "BL": "\x1b[94m", "WH": "\x1b[97m"}
@@ -203,7 +224,7 @@ class Debug:
         if not self.enabled or not sources:
             return
         for src in sources[:4]:  # Show top 4
-            domain = src.get("url", "").split('/')[2] if '/' in src.get("url", "") else "unknown"
+            domain = src.get("domain") or "unknown"
             title = src.get("title", "Untitled")[:40]
             self._print(f"  {self.C['D']}│{self.C['R']}     • {self.C['CY']}{domain}{self.C['R']} - {title}{'...' if len(src.get('title', '')) > 40 else ''}")
 
@@ -243,30 +264,30 @@ class Debug:
         self.metrics.warnings.append(message)
         # Only tracks, doesn't print - shown in summary
 
-    def flow(self, message: str) -> None:
+    def flow(self, message: str, *args: Any) -> None:
         pass  # Silent - key info captured by specialized methods
 
-    def synthesis(self, message: str) -> None:
+    def synthesis(self, message: str, *args: Any) -> None:
         pass  # Silent - summary shown in metrics_summary
 
     # Legacy compatibility methods (minimal/silent)
     def data(self, label: str, data: Any, truncate: int = 100) -> None:
         pass
-    def iteration(self, message: str) -> None:
+    def iteration(self, message: str, *args: Any) -> None:
         pass
-    def agent(self, message: str) -> None:
+    def agent(self, message: str, *args: Any) -> None:
         pass
-    def search(self, message: str) -> None:
+    def search(self, message: str, *args: Any) -> None:
         pass
     def url_metrics(self, found: int = 0, crawled: int = 0, successful: int = 0, failed: int = 0) -> None:
         self.metrics.total_sources += successful
     def content_metrics(self, chars: int, truncated: bool = False) -> None:
         pass
-    def report(self, message: str) -> None:
+    def report(self, message: str, *args: Any) -> None:
         pass
-    @contextmanager
-    def timer(self, operation_name: str):
-        yield
+    def timer(self, operation_name: str) -> nullcontext:
+        # Timing is not recorded; one shared no-op context avoids building a generator per use
+        return _NULL_TIMER
 
     def metrics_summary(self) -> None:
         if not self.enabled:
@@ -286,11 +307,11 @@ class Debug:
         # Show errors/warnings at the end
         if self.metrics.errors:
             self._print(f"\n  {self.C['RD']}{self.C['B']}Errors ({len(self.metrics.errors)}):{self.C['R']}")
-            for err in self.metrics.errors[:3]:  # Show up to 3
+            for err in islice(self.metrics.errors, 3):  # Show up to 3
                 self._print(f"    {self.C['RD']}• {err[:80]}{'...' if len(err) > 80 else ''}{self.C['R']}")
         if self.metrics.warnings:
             self._print(f"\n  {self.C['YE']}Warnings ({len(self.metrics.warnings)}):{self.C['R']}")
-            for warn in self.metrics.warnings[:3]:
+            for warn in islice(self.metrics.warnings, 3):
                 self._print(f"    {self.C['YE']}• {warn[:80]}{self.C['R']}")
         
         self._print(f"\n{self.C['MG']}{'═' * 60}{self.C['R']}\n")
@@ -300,6 +321,28 @@ class Debug:
 URL_RE = re.compile(r"https?://\S+")
 
 
+@functools.lru_cache(maxsize=16)
+def _field_pat(name: str) -> re.Pattern:
+    """Compiled single-line matcher for a `NAME:` field anywhere in a line (case-insensitive)."""
+    return re.compile(rf"(?im)^.*?{re.escape(name.rstrip(':'))}\s*:(.*)$")
+
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([\]}])")
+_JSON_FENCE_RE = re.compile(r'```json\s*(\{.*?\})\s*```', re.DOTALL)
+_SEARCH_CONFIG_RE = re.compile(r'SEARCH_CONFIG:\s*(\{.*?\})', re.DOTALL)
+_QUERIES_OBJ_RE = re.compile(r'\{[^{}]*"queries"[^{}]*\}', re.DOTALL)
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def _loads_llm_json(raw: str) -> Any:
+    """Parse JSON emitted by an LLM, tolerating trailing commas before `]` / `}`."""
+    try:
+        return _json_loads(raw)
+    except ValueError:
+        # Only rewrite on failure: the substitution would also edit valid string contents
+        return _json_loads(_TRAILING_COMMA_RE.sub(r"\1", raw))
+
+
 def _get_text_from_message(message_content: Any) -> str:
     """Extracts only the text part of a message, ignoring image data URLs."""
     if isinstance(message_content, list):
@@ -313,6 +356,112 @@ def _get_text_from_message(message_content: Any) -> str:
     return ""
 
 
+class _TTLCache:
+    """Small LRU mapping whose entries expire `ttl` seconds after being stored."""
+
+    def __init__(self, ttl: float, maxsize: int) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Any) -> Any:
+        """Return the cached value, or None if missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: Any, value: Any) -> None:
+        """Store a value, evicting the least recently used entries beyond maxsize."""
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+def _search_cache_key(search_kwargs: Dict[str, Any]) -> tuple:
+    """Hashable key for an Exa request; query whitespace and case are normalized."""
+    parts = []
+    for k, v in sorted(search_kwargs.items()):
+        if k == "query":
+            v = " ".join(v.split()).lower()
+        elif isinstance(v, list):
+            v = tuple(v)
+        elif isinstance(v, dict):
+            v = tuple(sorted(v.items()))
+        parts.append((k, v))
+    return tuple(parts)
+
+
+_PROMPT_CONTENT_CHARS = 15_000  # search results shown to the agent per iteration
+_OFFLOAD_FORMAT_CHARS = 32_000  # raw result text above which formatting leaves the event loop
+
+
+def _format_search_results(
+    results: List[Dict[str, Any]], budget_left: int
+) -> Tuple[str, int, int, List[Tuple[str, str]]]:
+    """
+    Format one iteration's results for the agent prompt.
+
+    Only what the prompt holds (first 8 results, _PROMPT_CONTENT_CHARS) is written, and text is
+    cut to the remaining content budget. Returns (content, entries written, chars of
+    text consumed, [(url, title)] of every result used).
+    """
+    buf = io.StringIO()
+    content_len = 0
+    content_count = 0
+    used = 0
+    sources = []
+    for result in results:
+        if result.get("text"):
+            remaining = budget_left - used
+            if remaining <= 0:
+                break
+            # Truncate to 1500 words (maxsplit stops scanning once they are found),
+            # then to what is left of the overall content budget
+            text = ' '.join(result["text"].split(None, 1500)[:1500])[:remaining]
+            url = result.get("url", "Unknown")
+            title = result.get("title", "Untitled")
+            if content_count < 8 and content_len < _PROMPT_CONTENT_CHARS:
+                entry = f"[{title}]\nURL: {url}\n{text}"
+                if content_count:
+                    entry = "\n\n---\n\n" + entry
+                # Written already cut to the prompt limit, so the buffer never holds more
+                entry = entry[:_PROMPT_CONTENT_CHARS - content_len]
+                buf.write(entry)
+                content_len += len(entry)
+                content_count += 1
+            used += len(text)
+            sources.append((url, title))
+    return buf.getvalue(), content_count, used, sources
+
+
+@functools.lru_cache(maxsize=128)
+def _backoff_schedule(delay: float, max_retries: int) -> tuple:
+    """Base exponential backoff wait (before jitter) for each retry attempt."""
+    return tuple(delay * (2**attempt) for attempt in range(max_retries))
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """
+    False for client errors that will fail the same way again (4xx other than
+    408 timeout / 429 rate limit); everything else is worth retrying.
+    """
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if isinstance(status, int) and 400 <= status < 500:
+        return status in (408, 429)
+    return True
+
+
 async def generate_with_retry(
     max_retries: int = 3, delay: int = 3, debug: Debug = None, **kwargs: Any
 ) -> Dict[str, Any]:
@@ -336,15 +485,15 @@ async def generate_with_retry(
                 if isinstance(body_bytes, bytes):
                     parsed = json.loads(body_bytes.decode('utf-8'))
                     if debug:
-                        debug.flow(f"Successfully parsed JSONResponse body")
-                        debug.data("Full parsed response", str(parsed)[:500] + "..." if len(str(parsed)) > 500 else str(parsed))
+                        debug.flow("Successfully parsed JSONResponse body")
+                        debug.data("Full parsed response", parsed, truncate=500)
                         debug.data("Response keys", list(parsed.keys()) if isinstance(parsed, dict) else "Not a dict")
                     return parsed
                 elif isinstance(body_bytes, str):
                     parsed = json.loads(body_bytes)
                     if debug:
-                        debug.flow(f"Successfully parsed JSONResponse string body")
-                        debug.data("Full parsed response", str(parsed)[:500] + "..." if len(str(parsed)) > 500 else str(parsed))
+                        debug.flow("Successfully parsed JSONResponse string body")
+                        debug.data("Full parsed response", parsed, truncate=500)
                         debug.data("Response keys", list(parsed.keys()) if isinstance(parsed, dict) else "Not a dict")
                     return parsed
         except Exception as e:
@@ -359,7 +508,7 @@ async def generate_with_retry(
                 if isinstance(rendered, bytes):
                     parsed = json.loads(rendered.decode('utf-8'))
                     if debug:
-                        debug.flow(f"Successfully parsed rendered response")
+                        debug.flow("Successfully parsed rendered response")
                     return parsed
         except Exception as e:
             if debug:
@@ -382,6 +531,7 @@ async def generate_with_retry(
 
     model_name = kwargs.get('form_data', {}).get('model', 'unknown')
     last_exception = None
+    schedule = _backoff_schedule(delay, max_retries)
     
     for attempt in range(max_retries):
         start_time = time.perf_counter()
@@ -393,7 +543,7 @@ async def generate_with_retry(
             if debug:
                 debug.llm_call(model_name, success=True, duration=duration)
                 if attempt > 0:
-                    debug.flow(f"LLM call succeeded on attempt {attempt + 1}")
+                    debug.flow("LLM call succeeded on attempt %d", attempt + 1)
             return result
         except Exception as e:
             duration = time.perf_counter() - start_time
@@ -405,10 +555,15 @@ async def generate_with_retry(
                     f"LLM call failed on attempt {attempt + 1}/{max_retries}: {str(e)[:100]}..."
                 )
 
+            if not _is_retryable(e):
+                if debug:
+                    debug.flow("Non-retryable error, giving up without further attempts")
+                break
+
             # Don't wait on the last attempt
             if attempt < max_retries - 1:
-                # Exponential backoff with jitter
-                wait_time = delay * (2**attempt) + (attempt * 0.5)
+                # Exponential backoff with jitter; asyncio.sleep keeps the event loop free
+                wait_time = schedule[attempt] * (1 + random.random() * 0.1)
                 await asyncio.sleep(wait_time)
 
     if debug:
@@ -427,6 +582,7 @@ async def generate_with_parsing_retry(
     Retries both API failures and response parsing failures.
     """
     last_exception = None
+    schedule = _backoff_schedule(delay, max_retries)
     
     for attempt in range(max_retries):
         try:
@@ -457,13 +613,16 @@ async def generate_with_parsing_retry(
             
             if debug:
                 debug.error(f"Generate with parsing retry failed on attempt {attempt + 1}/{max_retries}: {str(e)[:100]}...")
+
+            if not _is_retryable(e):
+                break
             
             # Don't wait on the last attempt
             if attempt < max_retries - 1:
                 # Use same exponential backoff as generate_with_retry
-                wait_time = delay * (2**attempt) + (attempt * 0.5)
+                wait_time = schedule[attempt] * (1 + random.random() * 0.1)
                 if debug:
-                    debug.flow(f"Waiting {wait_time:.1f}s before retry attempt {attempt + 2}")
+                    debug.flow("Waiting %.1fs before retry attempt %d", wait_time, attempt + 2)
                 await asyncio.sleep(wait_time)
     
     if debug:
@@ -484,6 +643,22 @@ class ToolsInternal:
             default=3,
             description="Maximum number of search iterations before returning results.",
         )
+        max_total_content_chars: int = Field(
+            default=500_000,
+            description="Hard budget on retrieved content characters across all iterations; searching stops once exceeded.",
+        )
+        min_new_info_ratio: float = Field(
+            default=0.1,
+            description="Stop early (from iteration 2) when less than this fraction of an iteration's extracted tokens are new. 0 disables.",
+        )
+        exa_pool_size: int = Field(
+            default=32,
+            description="Worker threads reserved for blocking Exa API calls (separate from the default asyncio executor).",
+        )
+        max_concurrent_searches: int = Field(
+            default=4,
+            description="Maximum Exa searches in flight at once across all users; extra searches wait their turn.",
+        )
         debug_enabled: bool = Field(
             default=False,
             description="Enable detailed debug logging for troubleshooting search operations.",
@@ -498,8 +673,14 @@ class ToolsInternal:
         self.citation = False  # REQUIRED: Disable automatic citations so custom citation events work
         self.debug = Debug(enabled=False)  # Will be updated when valves change
         self._exa: Optional[Exa] = None
-        self._query_cache: Dict[str, Any] = {}  # Simple query caching
-        self._cache_max_size = 100  # Limit cache size
+        self._exa_pool: Optional[ThreadPoolExecutor] = None
+        self._exa_pool_size = 0
+        self._search_sem: Optional[asyncio.Semaphore] = None
+        self._search_sem_size = 0
+        self._query_cache = _TTLCache(ttl=300, maxsize=32)  # Recent Exa results keyed by request
+        self._result_cache = _TTLCache(ttl=600, maxsize=128)  # Finished answers keyed by query
+        # Searches currently running, so concurrent identical requests share one API call
+        self._query_inflight: Dict[tuple, "asyncio.Future[List[Dict[str, Any]]]"] = {}
         self._active_sessions: Dict[str, asyncio.Lock] = {}  # Session concurrency control
         self._session_lock = asyncio.Lock()  # Lock for managing session locks
         self._last_error: Optional[str] = None  # Track the most recent error for user feedback
@@ -523,13 +704,42 @@ class ToolsInternal:
                 raise RuntimeError(f"Failed to initialize Exa client: {e}")
         return self._exa
 
+    def _exa_executor(self) -> ThreadPoolExecutor:
+        """Dedicated thread pool for the synchronous Exa SDK, resized when the valve changes."""
+        size = max(1, self.valves.exa_pool_size)
+        if self._exa_pool is None or self._exa_pool_size != size:
+            if self._exa_pool is not None:
+                self._exa_pool.shutdown(wait=False)
+            self._exa_pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix="exa")
+            self._exa_pool_size = size
+            self.debug.flow("Exa thread pool created with %d workers", size)
+        return self._exa_pool
+
+    def _search_semaphore(self) -> asyncio.Semaphore:
+        """Limit on concurrent Exa searches, rebuilt when the valve changes."""
+        size = max(1, self.valves.max_concurrent_searches)
+        if self._search_sem is None or self._search_sem_size != size:
+            self._search_sem = asyncio.Semaphore(size)
+            self._search_sem_size = size
+        return self._search_sem
+
+    def close(self) -> None:
+        """Release the Exa thread pool; it is recreated on the next search if needed."""
+        pool = getattr(self, "_exa_pool", None)
+        if pool is not None:
+            pool.shutdown(wait=False)
+            self._exa_pool = None
+
+    def __del__(self) -> None:
+        # OpenWebUI builds a new instance whenever the tool is saved; don't leave
+        # the old instance's idle worker threads behind
+        self.close()
+
     def _parse_search_config(self, agent_response: str) -> Dict[str, Any]:
         """
         Parse the agent's SEARCH_CONFIG JSON block from its response.
         Returns a validated config dict with defaults for missing values.
         """
-        import re
-        
         default_config = {
             "search_type": "auto",
             "category": None,
@@ -544,19 +754,19 @@ class ToolsInternal:
         
         try:
             # Try to find JSON block in markdown code fence
-            json_match = re.search(r'```json\s*(\{.*?\})\s*```', agent_response, re.DOTALL)
+            json_match = _JSON_FENCE_RE.search(agent_response)
             if json_match:
-                config = json.loads(json_match.group(1))
+                config = _loads_llm_json(json_match.group(1))
             else:
                 # Try to find raw JSON object
-                json_match = re.search(r'SEARCH_CONFIG:\s*(\{.*?\})', agent_response, re.DOTALL)
+                json_match = _SEARCH_CONFIG_RE.search(agent_response)
                 if json_match:
-                    config = json.loads(json_match.group(1))
+                    config = _loads_llm_json(json_match.group(1))
                 else:
                     # Last resort: find any JSON object
-                    json_match = re.search(r'\{[^{}]*"queries"[^{}]*\}', agent_response, re.DOTALL)
+                    json_match = _QUERIES_OBJ_RE.search(agent_response)
                     if json_match:
-                        config = json.loads(json_match.group(0))
+                        config = _loads_llm_json(json_match.group(0))
                     else:
                         self.debug.warning("Could not find SEARCH_CONFIG JSON in agent response")
                         return default_config
@@ -581,10 +791,9 @@ class ToolsInternal:
                 validated["num_results"] = max(1, min(25, config["num_results"]))
             
             # Date filters
-            date_pattern = re.compile(r'^\d{4}-\d{2}-\d{2}$')
-            if config.get("start_published_date") and date_pattern.match(str(config["start_published_date"])):
+            if config.get("start_published_date") and _DATE_RE.match(str(config["start_published_date"])):
                 validated["start_published_date"] = config["start_published_date"]
-            if config.get("end_published_date") and date_pattern.match(str(config["end_published_date"])):
+            if config.get("end_published_date") and _DATE_RE.match(str(config["end_published_date"])):
                 validated["end_published_date"] = config["end_published_date"]
             
             # Domain filters
@@ -603,7 +812,7 @@ class ToolsInternal:
             if isinstance(config.get("queries"), list):
                 validated["queries"] = [q for q in config["queries"] if isinstance(q, str) and q.strip()]
             
-            self.debug.flow(f"Parsed search config: {validated}")
+            self.debug.flow("Parsed search config: %s", validated)
             return validated
             
         except json.JSONDecodeError as e:
@@ -634,13 +843,15 @@ class ToolsInternal:
                 
                 # Execute only the first query (one query per iteration)
                 query = queries[0]
-                self.debug.search(f"Executing query: {query[:60]}...")
+                self.debug.search("Executing query: %.60s...", query)
                 
                 # Build search parameters - agent controls num_results (capped at Exa's max of 25)
                 search_kwargs = {
                     "query": query,
                     "num_results": min(config.get("num_results", 10), 25),
-                    "text": True,  # Include text content
+                    # Page text, capped server-side: no single page can show the agent more
+                    # than the per-iteration prompt limit, so the rest is never downloaded
+                    "text": {"max_characters": _PROMPT_CONTENT_CHARS},
                 }
                 
                 # Add optional parameters
@@ -665,25 +876,50 @@ class ToolsInternal:
                     search_kwargs["use_autoprompt"] = False
                 # "auto" and "deep" use default behavior
                 
-                result = await asyncio.to_thread(
-                    exa.search_and_contents,
-                    **search_kwargs
-                )
-                
-                # Use all results since search_and_contents already returns text
-                for r in result.results:
-                    all_results.append({
-                        "url": getattr(r, "url", ""),
-                        "title": getattr(r, "title", ""),
-                        "text": getattr(r, "text", ""),
-                        "published_date": getattr(r, "published_date", None),
-                    })
-                
-                self.debug.search(f"Query returned {len(result.results)} results with content")
+                cache_key = _search_cache_key(search_kwargs)
+                cached = self._query_cache.get(cache_key)
+                if cached is not None:
+                    self.debug.search("Reusing %d cached results", len(cached))
+                    return list(cached)
+
+                inflight = self._query_inflight.get(cache_key)
+                if inflight is not None:
+                    self.debug.search("Joining in-flight search for identical request")
+                    return list(await asyncio.shield(inflight))
+
+                fut = asyncio.get_running_loop().create_future()
+                self._query_inflight[cache_key] = fut
+                try:
+                    loop = asyncio.get_running_loop()
+                    async with self._search_semaphore():
+                        result = await loop.run_in_executor(
+                            self._exa_executor(),
+                            functools.partial(exa.search_and_contents, **search_kwargs),
+                        )
+
+                    # Use all results since search_and_contents already returns text
+                    for r in result.results:
+                        url = getattr(r, "url", "")
+                        all_results.append({
+                            "url": url,
+                            # Parsed once here; reused by debug output instead of re-splitting URLs
+                            "domain": urlparse(url).netloc.removeprefix("www.") if url else "",
+                            "title": getattr(r, "title", ""),
+                            "text": getattr(r, "text", ""),
+                            "published_date": getattr(r, "published_date", None),
+                        })
+                finally:
+                    del self._query_inflight[cache_key]
+                    fut.set_result(all_results)
+
+                if all_results:
+                    self._query_cache.put(cache_key, all_results)
+
+                self.debug.search("Query returned %d results with content", len(result.results))
                 self.debug.url_metrics(found=len(result.results), successful=len(result.results))
                 
-                self.debug.flow(f"Total results collected: {len(all_results)}")
-                return all_results
+                self.debug.flow("Total results collected: %d", len(all_results))
+                return list(all_results)
                 
             except Exception as e:
                 self.debug.error(f"Agentic search failed: {e}")
@@ -731,6 +967,11 @@ class ToolsInternal:
         
         return "\n".join(content_lines).strip()
 
+    def _extract_field(self, text: str, field_name: str) -> str:
+        """Extract the single-line value following the first `field_name` marker."""
+        m = _field_pat(field_name).search(text)
+        return m.group(1).strip() if m else ""
+
     def _get_session_lock(self, user_id: str, query_hash: str) -> asyncio.Lock:
         """Get or create a session lock for concurrent call protection."""
         session_key = f"{user_id}:{query_hash}"
@@ -775,7 +1016,7 @@ class ToolsInternal:
         
         # Check if another instance is already running for this user/query combo
         if session_lock.locked():
-            self.debug.flow(f"Concurrent call detected for user {user_id}, query hash {query_hash}")
+            self.debug.flow("Concurrent call detected for user %s, query hash %s", user_id, query_hash)
             return {
                 "content": "⚠️ A search is already in progress for this query. Please wait for it to complete before starting a new search.",
             }
@@ -784,8 +1025,9 @@ class ToolsInternal:
         async with session_lock:
             # Update debug state based on current valve setting
             self.debug.enabled = self.valves.debug_enabled
-            if self.debug.enabled:
-                self.debug.start_session(query)
+            # Always reset metrics (start_session only prints when enabled) so they
+            # don't accumulate across calls on this long-lived instance
+            self.debug.start_session(query)
             
             try:
                 return await self._execute_agentic_search(
@@ -804,6 +1046,27 @@ class ToolsInternal:
                     except Exception:
                         pass
 
+    async def _emit_citations(
+        self, emitter: Callable[[dict], Awaitable[None]], sources: Dict[str, str]
+    ) -> None:
+        """Emit one citation event per source (this is how OpenWebUI displays sources)."""
+        if not sources:
+            return
+        self.debug.flow("Emitting %d citation events", len(sources))
+        for url, title in sources.items():
+            await emitter({
+                "type": "citation",
+                "data": {
+                    "document": [f"Source: {title}"],
+                    "metadata": [{
+                        "date_accessed": datetime.now().isoformat(),
+                        "source": title,
+                        "url": url
+                    }],
+                    "source": {"name": title, "url": url}
+                }
+            })
+
     async def _execute_agentic_search(
         self,
         query: str,
@@ -816,30 +1079,59 @@ class ToolsInternal:
     ) -> dict:
         """Execute the agentic search with full agent control over search parameters."""
 
+        # Call sites check __event_emitter__ first, so with no emitter neither the
+        # coroutine nor its status string is built
         async def _status(desc: str, done: bool = False) -> None:
-            if __event_emitter__:
-                await __event_emitter__(
-                    {"type": "status", "data": {"description": desc, "done": done}}
-                )
+            await __event_emitter__(
+                {"type": "status", "data": {"description": desc, "done": done}}
+            )
+
+        # Bound once: the loop below reads these on every iteration
+        v = self.valves
+        debug = self.debug
 
         # Add debug info about the tool being called
-        self.debug.flow(f"AgenticSearch tool called with query: {query[:100]}...")
+        debug.flow("AgenticSearch tool called with query: %.100s...", query)
         if __user__:
-            self.debug.data("User ID", __user__.get("id", "unknown"))
+            debug.data("User ID", __user__.get("id", "unknown"))
         if __messages__:
-            self.debug.data("Message count", len(__messages__))
+            debug.data("Message count", len(__messages__))
 
         messages = __messages__ or []
         last_user_message = get_last_user_message(messages)
         if not last_user_message:
-            self.debug.error("Could not find a user message to process")
+            debug.error("Could not find a user message to process")
             return {
                 "content": "Could not find a user message to process. Please try again.",
                 "show_source": show_sources,
             }
 
-        self.debug.data("Search query (from AI)", query)
-        self.debug.data("Raw user message (for context)", last_user_message)
+        # Identical searches within the TTL return the previous answer without re-running the agent
+        result_key = (
+            " ".join(query.split()).lower(),
+            image_context or "",
+            v.agent_model,
+            v.max_iterations,
+            v.max_total_content_chars,
+            v.min_new_info_ratio,
+        )
+        cached = self._result_cache.get(result_key)
+        if cached is not None:
+            cached_content, cached_sources = cached
+            debug.flow("Returning cached result for identical search")
+            # Emitted inline: the hit path should not build coroutines just to skip them
+            if __event_emitter__:
+                await __event_emitter__(
+                    {"type": "status", "data": {"description": "Search complete.", "done": True}}
+                )
+                if show_sources:
+                    await self._emit_citations(__event_emitter__, cached_sources)
+            return {
+                "content": cached_content,
+            }
+
+        debug.data("Search query (from AI)", query)
+        debug.data("Raw user message (for context)", last_user_message)
 
         # Build conversation history snippet for context
         history_messages = messages[-6:-1]
@@ -852,24 +1144,29 @@ class ToolsInternal:
 
         # Include image context if provided
         if image_context:
-            self.debug.flow("Image context provided, enhancing search")
+            debug.flow("Image context provided, enhancing search")
             convo_snippet += f"\n\nIMAGE CONTEXT: {image_context}"
 
         user_obj = Users.get_user_by_id(__user__["id"]) if __user__ else None
         
         # Start the agentic search
         self._last_error = None
-        self.debug.flow("Starting agentic search with full parameter control")
+        debug.flow("Starting agentic search with full parameter control")
 
         try:
             current_date = datetime.now().strftime("%Y-%m-%d")
 
             # Configuration
-            max_iterations = self.valves.max_iterations
+            max_iterations = v.max_iterations
+            content_budget = v.max_total_content_chars
+            min_new_ratio = v.min_new_info_ratio
+            agent_model = v.agent_model
 
             all_findings = []
-            all_sources = []  # List of {"url": ..., "title": ...} dicts for OpenWebUI
+            all_sources: Dict[str, str] = {}  # url -> title, insertion-ordered for OpenWebUI
             iteration = 0
+            total_chars = 0  # Running total of retrieved content, checked against content_budget
+            seen_tokens: set = set()  # Tokens of all findings so far, for the novelty check
             final_agent_response = None
             
             # Initialize with default search config - agent will refine in first iteration
@@ -883,37 +1180,48 @@ class ToolsInternal:
             # ─── Iterative Search with Agent Control ─────────────────────────────────
             while iteration < max_iterations:
                 iteration += 1
-                self.debug.start_iteration(iteration, max_iterations)
+                debug.start_iteration(iteration, max_iterations)
 
-                # Execute search with agent-determined parameters
-                await _status(f"Searching ({search_config.get('search_type', 'auto')} mode)...")
                 # Log the config being used for this iteration
-                self.debug.search_config(search_config)
-                
-                search_results = await self._agentic_search_with_config(
-                    search_config, 
-                    f"iter_{iteration}"
-                )
+                debug.search_config(search_config)
 
-                # Format results for agent evaluation
-                iteration_content = []
-                for result in search_results:
-                    if result.get("text"):
-                        text = ' '.join(result["text"].split()[:1500])  # Truncate
-                        url = result.get("url", "Unknown")
-                        title = result.get("title", "Untitled")
-                        iteration_content.append(f"[{title}]\nURL: {url}\n{text}")
-                        # Track source with url and title for OpenWebUI display
-                        if not any(s["url"] == url for s in all_sources):
-                            all_sources.append({"url": url, "title": title})
-
-                self.debug.search_results(len(search_results))
-                # Show top sources in debug
-                iter_sources = [{"url": r.get("url", ""), "title": r.get("title", "")} for r in search_results if r.get("url")]
-                self.debug.sources_found(iter_sources)
+                # Execute search with agent-determined parameters; the status update
+                # is sent alongside the search rather than ahead of it
+                search = self._agentic_search_with_config(search_config, f"iter_{iteration}")
+                if __event_emitter__:
+                    _, search_results = await asyncio.gather(
+                        _status(f"Searching ({search_config.get('search_type', 'auto')} mode)..."),
+                        search,
+                    )
+                else:
+                    search_results = await search
+
+                # Format results for agent evaluation; large pages are split and joined on
+                # the Exa pool so other requests on the event loop aren't stalled
+                budget_left = content_budget - total_chars
+                if sum(len(r.get("text") or "") for r in search_results) > _OFFLOAD_FORMAT_CHARS:
+                    formatted = await asyncio.get_running_loop().run_in_executor(
+                        self._exa_executor(),
+                        functools.partial(_format_search_results, search_results, budget_left),
+                    )
+                else:
+                    formatted = _format_search_results(search_results, budget_left)
+                new_content, content_count, used_chars, iter_sources_seen = formatted
+                total_chars += used_chars
+                # Track source with url and title for OpenWebUI display
+                for url, title in iter_sources_seen:
+                    all_sources.setdefault(url, title)
+
+                debug.search_results(len(search_results))
+                debug.content_metrics(total_chars, truncated=total_chars >= content_budget)
+                # Show top sources in debug; result dicts already carry url/domain/title,
+                # so only the few that get printed are pulled, and only when debugging
+                if debug.enabled:
+                    debug.sources_found(list(islice((r for r in search_results if r.get("url")), 4)))
 
                 # ─── Agent Evaluation ─────────────────────────────────────────────
-                await _status("Analyzing findings...")
+                if __event_emitter__:
+                    await _status("Analyzing findings...")
 
                 # Build context for agent
                 if all_findings:
@@ -921,9 +1229,8 @@ class ToolsInternal:
                 else:
                     previous_findings = "## Previous Findings:\nNone yet - this is the first search."
 
-                if iteration_content:
-                    new_content = "\n\n---\n\n".join(iteration_content[:8])
-                    new_content_section = f"## New Search Results (from this iteration):\n{new_content[:15000]}"
+                if content_count:
+                    new_content_section = f"## New Search Results (from this iteration):\n{new_content}"
                 else:
                     new_content_section = "## New Search Results:\nNo content retrieved this iteration."
 
@@ -938,7 +1245,7 @@ class ToolsInternal:
                 )
 
                 agent_payload = {
-                    "model": self.valves.agent_model,
+                    "model": agent_model,
                     "messages": [{"role": "user", "content": agent_prompt}],
                     "stream": False,
                 }
@@ -947,7 +1254,7 @@ class ToolsInternal:
                     request=__request__,
                     form_data=agent_payload,
                     user=user_obj,
-                    debug=self.debug,
+                    debug=debug,
                     expected_keys=["choices", "content", "message"]
                 )
 
@@ -959,114 +1266,112 @@ class ToolsInternal:
                 else:
                     agent_response = str(agent_res)
 
-                self.debug.data("Agent response", agent_response, truncate=400)
+                debug.data("Agent response", agent_response, truncate=400)
 
                 # Extract status for UI
-                for line in agent_response.split("\n"):
-                    if "STATUS_SUMMARY:" in line.upper():
-                        await _status(line.split(":", 1)[1].strip()[:60])
-                        break
+                status_summary = self._extract_field(agent_response, "STATUS_SUMMARY:")
+                if status_summary and __event_emitter__:
+                    await _status(status_summary[:60])
 
                 # Extract findings
                 extracted_info = self._extract_section(agent_response, "EXTRACTED_INFO:")
+                new_tokens: set = set()
                 if extracted_info and extracted_info.lower() not in ["no new content", "none", ""]:
                     all_findings.append(f"[Iteration {iteration}]\n{extracted_info}")
-                    self.debug.flow(f"Added findings from iteration {iteration}")
+                    debug.flow("Added findings from iteration %d", iteration)
+                    new_tokens = set(extracted_info.lower().split())
+                new_ratio = len(new_tokens - seen_tokens) / max(1, len(new_tokens))
+                seen_tokens |= new_tokens
 
                 # Extract decision
-                decision = "CONTINUE"
-                for line in agent_response.split("\n"):
-                    if "DECISION:" in line.upper():
-                        if "STOP" in line.upper():
-                            decision = "STOP"
-                        break
+                decision_line = self._extract_field(agent_response, "DECISION:")
+                decision = "STOP" if "STOP" in decision_line.upper() else "CONTINUE"
 
                 # Show agent's evaluation in debug
                 evaluation = self._extract_section(agent_response, "EVALUATION:")
-                self.debug.agent_evaluation(evaluation)
+                debug.agent_evaluation(evaluation)
                 
-                self.debug.agent_decision(decision)
+                debug.agent_decision(decision)
 
                 if decision == "STOP":
-                    self.debug.flow("Agent determined information is sufficient")
+                    debug.flow("Agent determined information is sufficient")
                     final_agent_response = agent_response
                     break
 
+                if total_chars >= content_budget:
+                    debug.warning(f"Content budget reached ({total_chars}/{content_budget} chars), stopping")
+                    break
+
+                if iteration >= 2 and new_ratio < min_new_ratio:
+                    debug.flow("Only %.0f%% new information this iteration, stopping", new_ratio * 100)
+                    break
+
                 # If continuing, try to parse new search config from agent response
                 if iteration < max_iterations:
                     new_config = self._parse_search_config(agent_response)
                     if new_config.get("queries"):
                         search_config = new_config
-                        self.debug.flow(f"Agent updated search config with {len(new_config['queries'])} queries")
+                        debug.flow("Agent updated search config with %d queries", len(new_config['queries']))
                     else:
-                        self.debug.warning("No new queries in agent response, stopping")
+                        debug.warning("No new queries in agent response, stopping")
                         break
 
             # ─── Phase 3: Format Final Output ─────────────────────────────────────
-            await _status("Compiling research results...")
-            self.debug.flow(f"Final output: {len(all_findings)} findings, {len(all_sources)} sources")
+            if __event_emitter__:
+                await _status("Compiling research results...")
+            debug.flow("Final output: %d findings, %d sources", len(all_findings), len(all_sources))
 
             if not all_findings:
-                self.debug.warning("No findings collected")
+                debug.warning("No findings collected")
                 return {
                     "content": "I was unable to find relevant information for your request. Please try rephrasing your question.",
                 }
 
             # Extract summary from agent's final response
             if final_agent_response:
-                self.debug.flow("Extracting summary from agent's STOP response")
+                debug.flow("Extracting summary from agent's STOP response")
                 research_summary = self._extract_section(final_agent_response, "RESEARCH_SUMMARY:")
-                key_points = self._extract_section(final_agent_response, "KEY_POINTS:")
+                if not research_summary:
+                    debug.warning("Could not extract RESEARCH_SUMMARY, using raw findings")
+            else:
+                debug.flow("Max iterations reached, using accumulated findings")
+                research_summary = ""
 
-                if research_summary:
-                    final_content = f"RESEARCH_SUMMARY:\n{research_summary}"
-                    if key_points:
-                        final_content += f"\n\nKEY_POINTS:\n{key_points}"
-                    final_content += f"\n\nSOURCES_CONSULTED: {len(all_sources)}"
-                else:
-                    self.debug.warning("Could not extract RESEARCH_SUMMARY, using raw findings")
-                    final_content = f"RESEARCH_FINDINGS:\n" + "\n\n".join(all_findings)
-                    final_content += f"\n\nSOURCES_CONSULTED: {len(all_sources)}"
+            # Each branch yields one body; the sources footer is added in a single format
+            if research_summary:
+                key_points = self._extract_section(final_agent_response, "KEY_POINTS:")
+                body = f"RESEARCH_SUMMARY:\n{research_summary}"
+                if key_points:
+                    body = f"{body}\n\nKEY_POINTS:\n{key_points}"
             else:
-                self.debug.flow("Max iterations reached, using accumulated findings")
-                final_content = f"RESEARCH_FINDINGS:\n" + "\n\n".join(all_findings)
-                final_content += f"\n\nSOURCES_CONSULTED: {len(all_sources)}"
-
-            await _status("Search complete.", done=True)
-            self.debug.synthesis(f"Agentic search complete. {len(all_sources)} sources, {iteration} iterations.")
-
-            # Emit citation events for each source (this is how OpenWebUI displays sources)
-            if show_sources and __event_emitter__ and all_sources:
-                self.debug.flow(f"Emitting {len(all_sources)} citation events")
-                for source in all_sources:
-                    await __event_emitter__({
-                        "type": "citation",
-                        "data": {
-                            "document": [f"Source: {source['title']}"],
-                            "metadata": [{
-                                "date_accessed": datetime.now().isoformat(),
-                                "source": source["title"],
-                                "url": source["url"]
-                            }],
-                            "source": {"name": source["title"], "url": source["url"]}
-                        }
-                    })
-
-            if self.debug.enabled:
-                self.debug.metrics_summary()
+                body = "RESEARCH_FINDINGS:\n" + "\n\n".join(all_findings)
+            final_content = f"{body}\n\nSOURCES_CONSULTED: {len(all_sources)}"
+
+            if __event_emitter__:
+                await _status("Search complete.", done=True)
+            debug.synthesis("Agentic search complete. %d sources, %d iterations.", len(all_sources), iteration)
+
+            self._result_cache.put(result_key, (final_content, all_sources))
+
+            if show_sources and __event_emitter__:
+                await self._emit_citations(__event_emitter__, all_sources)
+
+            if debug.enabled:
+                debug.metrics_summary()
 
             return {
                 "content": final_content,
             }
 
         except Exception as e:
-            self.debug.error(f"Agentic search failed: {e}")
-            if self.debug.enabled:
-                self.debug.metrics_summary()
-            try:
-                await _status("", done=True)
-            except Exception:
-                pass
+            debug.error(f"Agentic search failed: {e}")
+            if debug.enabled:
+                debug.metrics_summary()
+            if __event_emitter__:
+                try:
+                    await _status("", done=True)
+                except Exception:
+                    pass
             return {
                 "content": f"I encountered an error during the search: {e}",
             }
@@ -1092,6 +1397,22 @@ class Tools:
             default=3,
             description="Maximum number of search iterations before returning results.",
         )
+        max_total_content_chars: int = Field(
+            default=500_000,
+            description="Hard budget on retrieved content characters across all iterations; searching stops once exceeded.",
+        )
+        min_new_info_ratio: float = Field(
+            default=0.1,
+            description="Stop early (from iteration 2) when less than this fraction of an iteration's extracted tokens are new. 0 disables.",
+        )
+        exa_pool_size: int = Field(
+            default=32,
+            description="Worker threads reserved for blocking Exa API calls (separate from the default asyncio executor).",
+        )
+        max_concurrent_searches: int = Field(
+            default=4,
+            description="Maximum Exa searches in flight at once across all users; extra searches wait their turn.",
+        )
         debug_enabled: bool = Field(
             default=False,
             description="Enable detailed debug logging for troubleshooting search operations.",
@@ -1113,7 +1434,7 @@ class Tools:
         # Create debug instance with consistent formatting
         debug = Debug(enabled=self.valves.debug_enabled)
         debug.flow("agentic_search function called")
-        debug.data("Query", query[:50] + "..." if len(query) > 50 else query)
+        debug.data("Query", query, truncate=50)
 
         # Sync valve settings to internal instance
         self.tools_instance.valves = self.valves